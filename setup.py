@@ -28,6 +28,7 @@ setup(
     long_description=read("PACKAGE.md"),
     long_description_content_type='text/markdown',
     install_requires=["requests", "crc32c", "binaryornot", "progress"],
+    extras_require={"fast": ["requests-toolbelt", "orjson"], "async": ["httpx[http2]"]},
     include_package_data=True,
     package_data={'': ['data/*.json']},
     classifiers=[
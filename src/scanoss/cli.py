@@ -22,12 +22,9 @@
    OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
    THE SOFTWARE.
 """
-import argparse
 import os
 import sys
 
-from .scanner import Scanner
-from .winnowing import Winnowing
 from . import __version__
 
 
@@ -38,10 +35,24 @@ def print_stderr(*args, **kwargs):
     print(*args, file=sys.stderr, **kwargs)
 
 
+def default_threads() -> int:
+    """
+    Calculate the default number of scanning threads based on the CPUs available to this process.
+    Scanning is network bound, so allow 4 threads per CPU, up to a maximum of 30
+    """
+    if hasattr(os, 'sched_getaffinity'):
+        cpus = len(os.sched_getaffinity(0))
+    else:
+        cpus = os.cpu_count() or 1
+    return min(30, 4 * cpus)
+
+
 def setup_args() -> None:
     """
     Setup all the command line arguments for processing
     """
+    import argparse
+
     parser = argparse.ArgumentParser(description=f'SCANOSS Python CLI. Ver: {__version__}, License: MIT')
     subparsers = parser.add_subparsers(title='Sub Commands', dest='subparser', description='valid subcommands',
                                        help='sub-command help'
@@ -65,8 +76,9 @@ def setup_args() -> None:
     p_scan.add_argument('--format',   '-f', type=str, choices=['plain', 'cyclonedx', 'spdxlite'],
                         help='Result output format (optional - default: plain)'
                         )
-    p_scan.add_argument('--threads', '-T', type=int, default=10,
-                        help='Number of threads to use while scanning (optional - default 10)'
+    p_scan.add_argument('--threads', '-T', type=int, default=default_threads(),
+                        help='Number of threads to use while scanning '
+                             '(optional - default 4 per available CPU, max 30)'
                         )
     p_scan.add_argument('--flags', '-F', type=int,
                         help='Scanning engine flags (1: disable snippet matching, 2 enable snippet ids, '
@@ -85,6 +97,10 @@ def setup_args() -> None:
     p_scan.add_argument('--all-extensions', action='store_true', help='Scan all file extensions')
     p_scan.add_argument('--all-folders', action='store_true', help='Scan all folders')
     p_scan.add_argument('--all-hidden', action='store_true', help='Scan all hidden files/folders')
+    p_scan.add_argument('--async', dest='use_async', action='store_true',
+                        help='Send scan requests asynchronously over HTTP/2 instead of one thread per request '
+                             '(requires: pip3 install scanoss[async])'
+                        )
 
     # Sub-command: fingerprint
     p_wfp = subparsers.add_parser('fingerprint', aliases=['fp', 'wfp'],
@@ -138,6 +154,8 @@ def wfp(parser, args):
         args: Namespace
             Parsed arguments
     """
+    from .scanner import Scanner
+
     if not args.scan_dir:
         print_stderr('Please specify a file/folder')
         parser.parse_args([args.subparser, '-h'])
@@ -170,6 +188,8 @@ def scan(parser, args):
         args: Namespace
             Parsed arguments
     """
+    from .scanner import Scanner
+
     if not args.scan_dir and not args.wfp:
         print_stderr('Please specify a file/folder or fingerprint (--wfp)')
         parser.parse_args([args.subparser, '-h'])
@@ -210,6 +230,8 @@ def scan(parser, args):
             print_stderr("Scanning all hidden files/folders...")
         if args.skip_snippets:
             print_stderr("Skipping snippets...")
+        if args.use_async:
+            print_stderr("Using asynchronous scanning...")
         if args.post_size != 64:
             print_stderr(f'Changing scanning POST size to: {args.post_size}k...')
         if args.timeout != 120:
@@ -226,7 +248,7 @@ def scan(parser, args):
                       sbom_path=sbom_path, scan_type=scan_type, scan_output=scan_output, output_format=output_format,
                       flags=flags, nb_threads=args.threads, skip_snippets=args.skip_snippets, post_size=args.post_size,
                       timeout=args.timeout, no_wfp_file=args.no_wfp_output, all_extensions=args.all_extensions,
-                      all_folders=args.all_folders, hidden_files_folders=args.all_hidden
+                      all_folders=args.all_folders, hidden_files_folders=args.all_hidden, use_async=args.use_async
                       )
     if args.wfp:
         if args.threads > 1:
@@ -255,6 +277,9 @@ def main():
     """
     Run the ScanOSS CLI
     """
+    if len(sys.argv) == 2 and sys.argv[1] in ('version', 'ver'):  # Fast path: no need to build the parser
+        ver(None, None)
+        return
     setup_args()
 
 
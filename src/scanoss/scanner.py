@@ -69,6 +69,7 @@ FILTERED_FILES = {  # Files to skip
                     "license.txt", "license.md", "copying.lib", "makefile"
                 }
 WFP_FILE_START = "file="
+WFP_FILE_START_BYTES = WFP_FILE_START.encode('utf-8')
 MAX_POST_SIZE = 64 * 1024  # 64k Max post size
 
 
@@ -80,7 +81,8 @@ class Scanner:
                  debug: bool = False, trace: bool = False, quiet: bool = False, api_key: str = None, url: str = None,
                  sbom_path: str = None, scan_type: str = None, flags: str = None, nb_threads: int = 5,
                  skip_snippets: bool = False, post_size: int = 64, timeout: int = 120, no_wfp_file: bool = False,
-                 all_extensions: bool = False, all_folders: bool = False, hidden_files_folders: bool = False
+                 all_extensions: bool = False, all_folders: bool = False, hidden_files_folders: bool = False,
+                 use_async: bool = False
                  ):
         """
         Initialise scanning class, including Winnowing, ScanossApi and ThreadedScanning
@@ -103,7 +105,7 @@ class Scanner:
         self.nb_threads = nb_threads
         if nb_threads and nb_threads > 0:
             self.threaded_scan = ThreadedScanning(self.scanoss_api, debug=debug, trace=trace, quiet=quiet,
-                                                  nb_threads=nb_threads
+                                                  nb_threads=nb_threads, use_async=use_async
                                                   )
         else:
             self.threaded_scan = None
@@ -274,11 +276,12 @@ class Scanner:
         if not self.quiet and self.isatty:
             spinner = Spinner('Fingerprinting ')
         wfp_list = []
-        scan_block = ''
-        scan_size = 0
-        queue_size = 0
+        scan_block = bytearray()
         file_count = 0
-        scan_started = False
+        save_wfp = not self.no_wfp_file or not self.threaded_scan  # Only keep the WFPs if they need writing to file
+        if self.threaded_scan and not self.threaded_scan.start():   # Start scanning while fingerprinting
+            self.print_stderr(f'ERROR: Failed to start the scanning threads.')
+            return False
         for root, dirs, files in os.walk(scan_dir):
             self.print_trace(f'U Root: {root}, Dirs: {dirs}, Files {files}')
             dirs[:] = self.__filter_dirs(dirs)                             # Strip out unwanted directories
@@ -296,34 +299,26 @@ class Scanner:
                     if spinner:
                         spinner.next()
                     wfp = self.winnowing.wfp_for_file(path, Scanner.__strip_dir(scan_dir, scan_dir_len, path))
-                    wfp_list.append(wfp)
+                    if save_wfp:
+                        wfp_list.append(wfp)
                     file_count += 1
                     if self.threaded_scan:
-                        wfp_size = len(wfp.encode("utf-8"))
-                        if (wfp_size + scan_size) >= self.max_post_size:
-                            self.threaded_scan.queue_add(scan_block)
-                            queue_size += 1
-                            scan_block = ''
-                        scan_block += wfp
-                        scan_size = len(scan_block.encode("utf-8"))
-                        if scan_size >= self.max_post_size:
-                            self.threaded_scan.queue_add(scan_block)
-                            queue_size += 1
-                            scan_block = ''
-                        if queue_size > self.nb_threads and not scan_started: # Start scanning if we have something to do
-                            scan_started = True
-                            if not self.threaded_scan.run(wait=False):
-                                self.print_stderr(
-                                    f'Warning: Some errors encounted while scanning. Results might be incomplete.')
-                                success = False
+                        wfp_bytes = wfp.encode("utf-8")  # Encode once, the post is assembled as bytes
+                        if (len(wfp_bytes) + len(scan_block)) >= self.max_post_size:
+                            self.threaded_scan.queue_add(bytes(scan_block))
+                            scan_block = bytearray()
+                        scan_block += wfp_bytes
+                        if len(scan_block) >= self.max_post_size:
+                            self.threaded_scan.queue_add(bytes(scan_block))
+                            scan_block = bytearray()
         # End for loop
         if self.threaded_scan and scan_block:
-            self.threaded_scan.queue_add(scan_block)  # Make sure all files have been submitted
+            self.threaded_scan.queue_add(bytes(scan_block))  # Make sure all files have been submitted
         if spinner:
             spinner.finish()
 
-        if wfp_list:
-            if not self.no_wfp_file or not self.threaded_scan:  # Write a WFP file if no threading or not not requested
+        if file_count > 0:
+            if save_wfp:  # Write a WFP file if no threading or not not requested
                 self.print_debug(f'Writing fingerprints to {self.wfp}')
                 with open(self.wfp, 'w') as f:
                     f.write(''.join(wfp_list))
@@ -333,28 +328,26 @@ class Scanner:
             if self.scan_output:
                 self.print_msg(f'Writing results to {self.scan_output}...')
             if self.threaded_scan:
-                success = self.__finish_scan_threaded(scan_started, file_count)
+                success = self.__finish_scan_threaded(file_count)
             else:
                 success = self.scan_wfp_file()
         else:
+            if self.threaded_scan:
+                self.threaded_scan.finish()
             Scanner.print_stderr(f'Warning: No files found to scan in folder: {scan_dir}')
         return success
 
-    def __finish_scan_threaded(self, scan_started: bool, file_count: int) -> bool:
+    def __finish_scan_threaded(self, file_count: int) -> bool:
         """
         Finish scanning the filtered files and wait for the threads to complete
-        :param scan_started: If the scan has already started or not
         :param file_count:  Number of total files to be scanned
         :return: True if successful, False otherwise
         """
         success = True
         self.threaded_scan.update_bar(create=True, file_count=file_count)
-        if not scan_started:
-            if not self.threaded_scan.run():           # Run the scan and wait for it to complete
-                self.print_stderr(f'Warning: Some errors encounted while scanning. Results might be incomplete.')
-                success = False
-        else:
-            self.threaded_scan.complete()               # Wait for the scans to complete
+        if not self.threaded_scan.finish():            # Wait for the scans to complete
+            self.print_stderr(f'Warning: Some errors encounted while scanning. Results might be incomplete.')
+            success = False
         self.threaded_scan.complete_bar()
         responses = self.threaded_scan.responses
         raw_output = "{\n"
@@ -541,44 +534,37 @@ class Scanner:
         if not os.path.exists(wfp_file) or not os.path.isfile(wfp_file):
             raise Exception(f"ERROR: Specified WFP file does not exist or is not a file: {wfp_file}")
         cur_size = 0
-        scan_size = 0
-        queue_size = 0
         file_count = 0
-        scan_started = False
-        wfp = ''
-        scan_block = ''
-        with open(wfp_file) as f:   # Parse the WFP file
+        wfp = bytearray()
+        scan_block = bytearray()
+        if not self.threaded_scan.start():   # Start scanning while parsing the WFP file
+            self.print_stderr(f'ERROR: Failed to start the scanning threads.')
+            return False
+        with open(wfp_file, 'rb') as f:   # Parse the WFP file (as bytes, ready for posting)
             for line in f:
-                if line.startswith(WFP_FILE_START):
+                line = line.replace(b'\r\n', b'\n')  # Match the newline translation of text mode reads
+                if line.startswith(WFP_FILE_START_BYTES):
                     if scan_block:
                         wfp += scan_block         # Store the WFP for the current file
-                        cur_size = len(wfp.encode("utf-8"))
-                    scan_block = line             # Start storing the next file
+                        cur_size = len(wfp)
+                    scan_block = bytearray(line)  # Start storing the next file
                     file_count += 1
                 else:
                     scan_block += line             # Store the rest of the WFP for this file
-                l_size = cur_size + len(scan_block.encode('utf-8'))
+                l_size = cur_size + len(scan_block)
                 # Hit the max post size, so sending the current batch and continue processing
                 if l_size >= self.max_post_size and wfp:
                     if cur_size > self.max_post_size:
                         Scanner.print_stderr(f'Warning: Post size {cur_size} greater than limit {self.max_post_size}')
-                    self.threaded_scan.queue_add(wfp)
-                    queue_size += 1
-                    wfp = ''
-                    if queue_size > self.nb_threads and not scan_started:  # Start scanning if we have something to do
-                        scan_started = True
-                        if not self.threaded_scan.run(wait=False):
-                            self.print_stderr(
-                                        f'Warning: Some errors encounted while scanning. Results might be incomplete.')
-                            success = False
+                    self.threaded_scan.queue_add(bytes(wfp))
+                    wfp = bytearray()
             # End for loop
         if scan_block:
             wfp += scan_block  # Store the WFP for the current file
         if wfp:
-            self.threaded_scan.queue_add(wfp)
-            queue_size += 1
+            self.threaded_scan.queue_add(bytes(wfp))
 
-        if not self.__finish_scan_threaded(scan_started, file_count):
+        if not self.__finish_scan_threaded(file_count):
             success = False
         return success
 
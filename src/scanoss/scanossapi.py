@@ -21,18 +21,43 @@
    OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
    THE SOFTWARE.
 """
+import importlib
+import importlib.util
+import json
 import logging
 import os
+import random
+import secrets
 import sys
 import time
 from json.decoder import JSONDecodeError
 import requests
-import uuid
 import http.client as http_client
+from typing import Union
+from requests.adapters import HTTPAdapter
 
 DEFAULT_URL      = "https://osskb.org/api/scan/direct"
 SCANOSS_SCAN_URL = os.environ.get("SCANOSS_SCAN_URL") if os.environ.get("SCANOSS_SCAN_URL") else DEFAULT_URL
 SCANOSS_API_KEY  = os.environ.get("SCANOSS_API_KEY")  if os.environ.get("SCANOSS_API_KEY")  else ''
+HTTP_POOL_SIZE   = 32  # Max number of pooled (keep-alive) connections to the API
+RETRY_MIN_DELAY  = 0.5   # Seconds (initial back-off delay between retries)
+RETRY_MAX_DELAY  = 30.0  # Seconds (max back-off delay between retries)
+
+_optional_modules = {}  # Cache of optional modules, loaded on first use (None if not installed)
+
+
+def _optional_import(name: str):
+    """
+    Import an optional dependency the first time it is needed, so it does not slow down start-up
+    :param name: module name (i.e. requests_toolbelt, orjson, httpx)
+    :return: module or None if it is not installed
+    """
+    if name not in _optional_modules:
+        try:
+            _optional_modules[name] = importlib.import_module(name)
+        except ImportError:
+            _optional_modules[name] = None
+    return _optional_modules[name]
 
 
 class ScanossApi:
@@ -63,13 +88,27 @@ class ScanossApi:
         self.scan_type = scan_type
         self.sbom_path = sbom_path
         self.scan_format = scan_format if scan_format else 'plain'
+        self._is_xml = 'xml' in self.scan_format  # XML results are returned as text, not parsed
         self.flags = flags
         self.timeout = timeout if timeout > 5 else 120
         self.headers = {}
         if self.api_key:
             self.headers['X-Session'] = self.api_key
+        self.session = requests.Session()  # Reuse connections across scan requests (keep-alive)
+        adapter = HTTPAdapter(pool_connections=HTTP_POOL_SIZE, pool_maxsize=HTTP_POOL_SIZE, max_retries=0)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.session.headers.update(self.headers)
         self.sbom = None
         self.load_sbom()     # Load an input SBOM if one is specified
+        self._base_form = {}  # Form data shared by every scan request (read-only once built)
+        if self.sbom:
+            self._base_form['type'] = self.scan_type
+            self._base_form['assets'] = self.sbom
+        if self.scan_format:
+            self._base_form['format'] = self.scan_format
+        if self.flags:
+            self._base_form['flags'] = str(self.flags)
         if self.trace:
             logging.basicConfig(stream=sys.stderr, level=logging.DEBUG)
             http_client.HTTPConnection.debuglevel = 1
@@ -85,39 +124,36 @@ class ScanossApi:
             with open(self.sbom_path) as f:
                 self.sbom = f.read()
 
-    def scan(self, wfp: str, context: str = None, scan_id: int = None):
+    def scan(self, wfp: Union[bytes, str], context: str = None, scan_id: int = None):
         """
         Scan the specifid WFP and return the JSON object
 
-        :param wfp: WFP to scan
+        :param wfp: WFP to scan (UTF-8 encoded bytes are posted as is)
         :param context: Context to help with idenification
         :return: JSON result object
         """
-        form_data = {}
-        if self.sbom:
-            form_data['type'] = self.scan_type
-            form_data['assets'] = self.sbom
-        if self.scan_format:
-            form_data['format'] = self.scan_format
-        if self.flags:
-            form_data['flags'] = self.flags
-        if context:
-            form_data['context'] = context
-        scan_files = {'file': ("%s.wfp" % uuid.uuid1().hex, wfp)}
+        form_data = {**self._base_form, 'context': context} if context else self._base_form
+        scan_files = {'file': (f"{secrets.token_hex(8)}.wfp", wfp, 'application/octet-stream')}
+        toolbelt = _optional_import('requests_toolbelt')  # Optional: stream multipart posts
         r     = None
         retry = 0    # Add some retry logic to cater for timeouts, etc.
         while retry <= 5:
             retry += 1
             try:
                 r = None
-                r = requests.post(self.url, files=scan_files, data=form_data, headers=self.headers, timeout=self.timeout)
+                if toolbelt:  # Encoder is a stream, so it needs re-creating for each attempt
+                    encoder = toolbelt.MultipartEncoder(fields={**form_data, **scan_files})
+                    r = self.session.post(self.url, data=encoder, headers={'Content-Type': encoder.content_type},
+                                          timeout=self.timeout)
+                else:
+                    r = self.session.post(self.url, files=scan_files, data=form_data, timeout=self.timeout)
             except (requests.exceptions.Timeout, requests.exceptions.ConnectionError) as e:
                 if retry > 5:   # Timed out 5 or more times, fail
                     self.print_stderr(f'ERROR: Timeout/Connection Error POSTing data: {scan_files}')
                     raise Exception(f"ERROR: The SCANOSS API request timed out for {self.url}") from e
                 else:
                     self.print_stderr(f'Warning: Timeout/Connection Error communicating with {self.url}. Retrying...')
-                    time.sleep(5)
+                    time.sleep(self.__retry_delay(retry))
             except Exception as e:
                 self.print_stderr(f'ERROR: Exception POSTing data: {scan_files}')
                 raise Exception(f"ERROR: The SCANOSS API request failed for {self.url}") from e
@@ -127,24 +163,99 @@ class ScanossApi:
                         raise Exception(f"ERROR: The SCANOSS API request response object is empty for {self.url}")
                     else:
                         self.print_stderr(f'Warning: No response received from {self.url}. Retrying...')
-                        time.sleep(5)
+                        time.sleep(self.__retry_delay(retry, r))
                 elif r.status_code >= 400:
                     if retry > 5:   # No response 5 or more times, fail
                         raise Exception(f"ERROR: The SCANOSS API returned the following error: HTTP {r.status_code}, {r.text}")
                     else:
                         self.print_stderr(f'Warning: Error response code {r.status_code} from {self.url}. Retrying...')
-                        time.sleep(5)
+                        time.sleep(self.__retry_delay(retry, r))
                 else:
                     retry = 6
                     break     # Valid response, break out of the retry loop
         # End of while loop
         if not r:
             raise Exception(f"ERROR: The SCANOSS API request response object is empty for {self.url}")
+        return self.__parse_response(r, scan_files, scan_id)
+
+    @staticmethod
+    def async_supported() -> bool:
+        """
+        Check if asynchronous scanning (ascan) is available, i.e. httpx is installed
+        :return: True if supported, False otherwise
+        """
+        return importlib.util.find_spec('httpx') is not None
+
+    def async_client(self, max_connections: int):
+        """
+        Create an asynchronous HTTP client to use with ascan (HTTP/2 is enabled if h2 is installed)
+        :param max_connections: Maximum number of connections to the API
+        :return: httpx.AsyncClient
+        """
+        httpx = _optional_import('httpx')
+        return httpx.AsyncClient(http2=importlib.util.find_spec('h2') is not None, headers=self.headers,
+                                 timeout=self.timeout, limits=httpx.Limits(max_connections=max_connections,
+                                                                           max_keepalive_connections=max_connections)
+                                 )
+
+    async def ascan(self, client, wfp: Union[bytes, str], context: str = None, scan_id: int = None):
+        """
+        Scan the specifid WFP asynchronously and return the JSON object
+
+        :param client: httpx.AsyncClient to post with (see async_client)
+        :param wfp: WFP to scan (UTF-8 encoded bytes are posted as is)
+        :param context: Context to help with idenification
+        :return: JSON result object
+        """
+        import asyncio
+
+        httpx = _optional_import('httpx')
+        form_data = {**self._base_form, 'context': context} if context else self._base_form
+        scan_files = {'file': (f"{secrets.token_hex(8)}.wfp", wfp, 'application/octet-stream')}
+        r     = None
+        retry = 0    # Add some retry logic to cater for timeouts, etc.
+        while retry <= 5:
+            retry += 1
+            try:
+                r = None
+                r = await client.post(self.url, files=scan_files, data=form_data)
+            except httpx.TransportError as e:
+                if retry > 5:   # Timed out 5 or more times, fail
+                    self.print_stderr(f'ERROR: Timeout/Connection Error POSTing data: {scan_files}')
+                    raise Exception(f"ERROR: The SCANOSS API request timed out for {self.url}") from e
+                else:
+                    self.print_stderr(f'Warning: Timeout/Connection Error communicating with {self.url}. Retrying...')
+                    await asyncio.sleep(self.__retry_delay(retry))
+            except Exception as e:
+                self.print_stderr(f'ERROR: Exception POSTing data: {scan_files}')
+                raise Exception(f"ERROR: The SCANOSS API request failed for {self.url}") from e
+            else:
+                if r.status_code >= 400:
+                    if retry > 5:   # Error response 5 or more times, fail
+                        raise Exception(f"ERROR: The SCANOSS API returned the following error: HTTP {r.status_code}, {r.text}")
+                    else:
+                        self.print_stderr(f'Warning: Error response code {r.status_code} from {self.url}. Retrying...')
+                        await asyncio.sleep(self.__retry_delay(retry, r))
+                else:
+                    break     # Valid response, break out of the retry loop
+        # End of while loop
+        return self.__parse_response(r, scan_files, scan_id)
+
+    def __parse_response(self, r, scan_files: dict, scan_id: int = None):
+        """
+        Parse the scan response, recording any invalid JSON to a file for later investigation
+        :param r: successful response object (requests or httpx)
+        :param scan_files: files posted with the request
+        :param scan_id: ID of the scan (optional)
+        :return: JSON result object (or text for XML formats), None on failure
+        """
         try:
-            if 'xml' in self.scan_format:
+            if self._is_xml:
                 return r.text
-            json_resp = r.json()
-            return json_resp
+            orjson = _optional_import('orjson')  # Optional: faster JSON response parsing
+            if orjson:
+                return orjson.loads(r.content)
+            return json.loads(r.content)     # Skip the charset detection done by r.json()
         except (JSONDecodeError, Exception) as e:
             self.print_stderr(f'ERROR: The SCANOSS API returned an invalid JSON: {e}')
             ctime = int(time.time())
@@ -159,6 +270,29 @@ class ScanossApi:
                 self.print_stderr(f'Warning: Issue writing bad json file - {bad_json_file}: {ee}')
             return None
 
+    @staticmethod
+    def __retry_delay(retry: int, r=None) -> float:
+        """
+        Calculate how long to wait before the next retry (exponential back-off with jitter)
+        A Retry-After header (in seconds) from the server takes precedence
+        :param retry: retry attempt number (starting at 1)
+        :param r: response from the failed request (optional)
+        :return: delay in seconds
+        """
+        delay = random.uniform(RETRY_MIN_DELAY, min(RETRY_MAX_DELAY, RETRY_MIN_DELAY * (2 ** retry)))
+        if r is not None and r.headers.get('Retry-After'):
+            try:
+                delay = max(0.0, min(RETRY_MAX_DELAY, float(r.headers.get('Retry-After'))))
+            except ValueError:
+                pass  # Ignore HTTP-date values, just use the back-off delay
+        return delay
+
+    def close(self):
+        """
+        Close the HTTP session and release any pooled connections
+        """
+        self.session.close()
+
     def print_msg(self, *args, **kwargs):
         """
         Print message if quite mode is not enabled
@@ -25,30 +25,26 @@ import os
 import sys
 import threading
 import queue
-import time
 
-from typing import Dict, List
-from dataclasses import dataclass
+from typing import Dict, List, Union
 from progress.bar import Bar
 
 from .scanossapi import ScanossApi
 
-WFP_FILE_START = "file="
+WFP_FILE_START = b"file="
 MAX_ALLOWED_THREADS = 30
+BAR_UPDATE_INTERVAL = 0.1  # Seconds between progress bar refreshes
 
-@dataclass
 class ThreadedScanning(object):
     """
     Threaded class for running Scanning in parallel (from a queue)
     WFP scan requests are loaded into the input queue.
     Multiple threads pull messages off this queue, process the request and put the results into an output queue
+    If use_async is requested (and httpx is installed), a single thread runs an event loop with the same number of
+    asynchronous workers instead
     """
-    inputs: queue.Queue = queue.Queue()
-    output: queue.Queue = queue.Queue()
-    bar: Bar = None
-
     def __init__(self, scanapi :ScanossApi, debug: bool = False, trace: bool = False, quiet: bool = False,
-                 nb_threads: int = 5
+                 nb_threads: int = 5, use_async: bool = False
                  ) -> None:
         """
         Initialise the ThreadedScanning class
@@ -57,6 +53,7 @@ class ThreadedScanning(object):
         :param trace: enable trace (default False)
         :param quiet: enable quiet mode (default False)
         :param nb_threads: Number of thread to run (default 5)
+        :param use_async: send requests asynchronously from one thread, if httpx is available (default False)
         """
         self.scanapi = scanapi
         self.debug = debug
@@ -64,14 +61,25 @@ class ThreadedScanning(object):
         self.quiet = quiet
         self.nb_threads = nb_threads
         self._isatty = sys.stderr.isatty()
-        self._bar_count = 0
+        self._bar_pending = 0
+        self._bar_stop = threading.Event()
+        self._bar_thread = None
         self._errors = False
         self._lock = threading.Lock()
-        self._stop_event = threading.Event()
         self._threads = []
+        self._nb_workers = 0
+        self._async_unfinished = 0  # Requests taken off the input queue by the event loop, but not yet completed
+        self._async_stopped = 0     # Stop sentinels taken off the input queue by the event loop
+        self._async = use_async
+        if use_async and not scanapi.async_supported():
+            self.print_msg('Warning: Asynchronous scanning requires httpx (pip3 install scanoss[async]). Using threads.')
+            self._async = False
         if nb_threads > MAX_ALLOWED_THREADS:
             self.print_msg(f'Warning: Requested threads too large: {nb_threads}. Reducing to {MAX_ALLOWED_THREADS}')
             self.nb_threads = MAX_ALLOWED_THREADS
+        self.inputs: queue.Queue = queue.Queue(maxsize=2 * self.nb_threads)  # Bounded to apply back pressure
+        self.output: queue.Queue = queue.Queue()
+        self.bar: Bar = None
 
     @staticmethod
     def print_stderr(*args, **kwargs):
@@ -81,18 +89,15 @@ class ThreadedScanning(object):
         print(*args, file=sys.stderr, **kwargs)
 
     @staticmethod
-    def __count_files_in_wfp(wfp: str):
+    def __count_files_in_wfp(wfp: bytes):
         """
         Count the number of files in the WFP that need to be processed
-        :param wfp: WFP string
+        :param wfp: WFP (UTF-8 encoded bytes)
         :return: number of files in the WFP
         """
-        count = 0
-        if wfp:
-            for line in wfp.split('\n'):
-                if WFP_FILE_START in line:
-                    count += 1
-        return count
+        if not wfp:
+            return 0
+        return wfp.count(b'\n' + WFP_FILE_START) + (1 if wfp.startswith(WFP_FILE_START) else 0)
 
     def print_msg(self, *args, **kwargs):
         """
@@ -117,13 +122,46 @@ class ThreadedScanning(object):
 
     def create_bar(self, file_count: int):
         if not self.quiet and self._isatty and not self.bar:
-            self.bar = Bar('Scanning', max=file_count)
-            self.bar.next(self._bar_count)
+            self.bar = Bar('Scanning', max=file_count)  # Pending progress is drawn on the next refresh
 
     def complete_bar(self):
+        self.stop_bar_updater()
+        self.flush_bar()
         if self.bar:
             self.bar.finish()
 
+    def flush_bar(self) -> None:
+        """
+        Draw any pending progress on the Progress Bar (if it exists)
+        """
+        self._lock.acquire()
+        try:
+            if not self.bar or not self._bar_pending:
+                return
+            amount, self._bar_pending = self._bar_pending, 0
+        finally:
+            self._lock.release()
+        self.bar.next(amount)
+
+    def stop_bar_updater(self) -> None:
+        """
+        Stop the Progress Bar refresh thread (if running)
+        """
+        self._bar_stop.set()
+        if self._bar_thread:
+            self._bar_thread.join()
+            self._bar_thread = None
+
+    def bar_updater(self) -> None:
+        """
+        Periodically refresh the Progress Bar, so worker threads never have to render it
+        """
+        while not self._bar_stop.wait(BAR_UPDATE_INTERVAL):
+            try:
+                self.flush_bar()
+            except Exception as e:
+                self.print_debug(f'Warning: Problem updating status bar: {e}. Ignoring.')
+
     def set_bar(self, bar: Bar) -> None:
         """
         Set the Progress Bar to display progress while scanning
@@ -133,7 +171,7 @@ class ThreadedScanning(object):
 
     def update_bar(self, amount: int = 0, create: bool = False, file_count: int = 0) -> None:
         """
-        Update the Progress Bar progress
+        Update the Progress Bar progress (the bar itself is redrawn by the bar_updater thread)
         :param amount: amount of progress to update
         """
         try:
@@ -141,19 +179,19 @@ class ThreadedScanning(object):
             try:
                 if create and not self.bar:
                     self.create_bar(file_count)
-                elif self.bar:
-                    self.bar.next(amount)
-                self._bar_count += amount
+                self._bar_pending += amount
             finally:
                 self._lock.release()
         except Exception as e:
             self.print_debug(f'Warning: Update status bar lock failed: {e}. Ignoring.')
 
-    def queue_add(self, wfp: str) -> None:
+    def queue_add(self, wfp: Union[bytes, str]) -> None:
         """
-        Add requests to the queue
-        :param wfp: WFP to add to queue
+        Add requests to the queue (blocks while the queue is full)
+        :param wfp: WFP to add to queue (str is encoded to UTF-8 bytes)
         """
+        if not isinstance(wfp, bytes):
+            wfp = wfp.encode('utf-8')
         self.inputs.put(wfp)
 
     def get_queue_size(self) -> int:
@@ -165,75 +203,176 @@ class ThreadedScanning(object):
         Get all responses back from the completed threads
         :return: List of JSON objects
         """
-        return list(self.output.queue)
+        with self.output.mutex:  # Snapshot the queue contents while holding its lock
+            return list(self.output.queue)
 
-    def run(self, wait: bool = True) -> bool:
+    def start(self) -> bool:
         """
-        Initiate the threads and process all pending requests
+        Initiate the worker threads. Requests can then be streamed into the input queue using queue_add
         :return: True if successful, False if error encountered
         """
-        qsize = self.inputs.qsize()
-        if qsize < self.nb_threads:
-            self.print_debug(f'Input queue ({qsize}) smaller than requested threads: {self.nb_threads}. '
-                             f'Reducing to queue size.')
-            self.nb_threads = qsize
-        else:
-            self.print_debug(f'Starting {self.nb_threads} threads to process {qsize} requests...')
+        success = True   # Not self._errors, as the workers may already be reporting errors of their own
         try:
-            for i in range(0, self.nb_threads):
-                t = threading.Thread(target=self.worker_post, daemon=True)
+            if self._async:
+                self.print_debug(f'Starting {self.nb_threads} async workers to process requests...')
+                t = threading.Thread(target=self.worker_async, daemon=True)
                 self._threads.append(t)
+                self._nb_workers = self.nb_threads
                 t.start()
+            else:
+                self.print_debug(f'Starting {self.nb_threads} threads to process requests...')
+                for i in range(0, self.nb_threads):
+                    t = threading.Thread(target=self.worker_post, daemon=True)
+                    self._threads.append(t)
+                    self._nb_workers += 1
+                    t.start()
+            if not self.quiet and self._isatty:  # Only refresh the progress bar if it can be displayed
+                self._bar_thread = threading.Thread(target=self.bar_updater, daemon=True)
+                self._bar_thread.start()
         except Exception as e:
             self.print_stderr(f'ERROR: Problem running threaded scanning: {e}')
             self._errors = True
-        if wait:                    # Wait for all inputs to complete
-            self.complete()
-        return False if self._errors else True
+            success = False
+        return success
 
-    def complete(self) -> None:
+    def finish(self) -> bool:
         """
         Wait for input queue to complete processing and complete the worker threads
+        :return: True if successful, False if error encountered
         """
+        for _ in range(self._nb_workers):  # Tell each worker to stop once the queue has been drained
+            self.inputs.put(None)
         self.inputs.join()
-        self._stop_event.set()       # Tell the worker threads to stop
         try:
             for t in self._threads:  # Complete the threads
                 t.join(timeout=5)
         except Exception as e:
             self.print_stderr(f'WARNING: Issue encountered terminating scanning worker threads: {e}')
+        self.stop_bar_updater()
+        self.scanapi.close()
+        return False if self._errors else True
 
     def worker_post(self) -> None:
         """
-        Take each request and process it
+        Take each request and process it (until a stop sentinel is received)
         :return: None
         """
         current_thread = threading.get_ident()
         self.print_trace(f'Starting worker {current_thread}...')
-        while not self._stop_event.is_set():
-            wfp = None
-            if not self.inputs.empty():          # Only try to get a message if there is one on the queue
-                try:
-                    wfp = self.inputs.get(timeout=5)
-                    self.print_trace(f'Processing input request ({current_thread})...')
-                    count = self.__count_files_in_wfp(wfp)
-                    resp = self.scanapi.scan(wfp, scan_id=current_thread)
-                    if resp:
-                        self.output.put(resp)  # Store the output response to later collection
-                    self.update_bar(count)
-                    self.inputs.task_done()
-                    self.print_trace(f'Request complete ({current_thread}).')
-                except queue.Empty as e:
-                    self.print_stderr(f'No message available to process ({current_thread}). Checking again...')
-                except Exception as e:
-                    ThreadedScanning.print_stderr(f'ERROR: Problem encountered running scan: {e}')
-                    self._errors = True
-                    if wfp:
-                        self.inputs.task_done()  # If there was a WFP being processed, remove it from the queue
-            else:
-                time.sleep(1)  # Sleep while waiting for the queue depth to build up
+        while True:
+            wfp = self.inputs.get()              # Block until there is something to process
+            if wfp is None:                      # Stop sentinel received
+                self.inputs.task_done()
+                break
+            try:
+                self.print_trace(f'Processing input request ({current_thread})...')
+                count = self.__count_files_in_wfp(wfp)
+                resp = self.scanapi.scan(wfp, scan_id=current_thread)
+                if resp:
+                    self.output.put(resp)  # Store the output response to later collection
+                self.update_bar(count)
+                self.print_trace(f'Request complete ({current_thread}).')
+            except Exception as e:
+                ThreadedScanning.print_stderr(f'ERROR: Problem encountered running scan: {e}')
+                self._errors = True
+            finally:
+                self.inputs.task_done()
         self.print_trace(f'Thread complete ({current_thread}).')
 
+    def worker_async(self) -> None:
+        """
+        Run the asynchronous workers in an event loop on this thread
+        If the event loop fails, any requests it had taken are dropped and worker threads process the rest of the queue
+        :return: None
+        """
+        import asyncio
+
+        try:
+            asyncio.run(self.__async_scan())
+        except Exception as e:
+            with self._lock:
+                unfinished, self._async_unfinished = self._async_unfinished, 0
+                remaining = self._nb_workers - self._async_stopped
+            for _ in range(unfinished):  # Release what the event loop took, so that finish() does not block
+                self.inputs.task_done()
+            self.print_stderr(f'Warning: Problem running asynchronous scanning: {e}. '
+                              f'Reverting to {remaining} worker threads.')
+            if unfinished:
+                self._errors = True   # Only an error if requests were dropped, the fallback threads scan the rest
+                self.print_stderr(f'Warning: Some queued requests were not scanned. Results might be incomplete.')
+            for i in range(0, remaining):  # One thread for each stop sentinel still to be received
+                t = threading.Thread(target=self.worker_post, daemon=True)
+                self._threads.append(t)
+                t.start()
+
+    def __async_take(self):
+        """
+        Take the next request off the input queue (blocking), keeping count of what the event loop holds
+        :return: WFP or None (stop sentinel)
+        """
+        wfp = self.inputs.get()
+        with self._lock:
+            self._async_unfinished += 1
+            if wfp is None:
+                self._async_stopped += 1
+        return wfp
+
+    def __async_task_done(self) -> None:
+        """
+        Mark a request taken by the event loop as complete
+        """
+        with self._lock:
+            self._async_unfinished -= 1
+        self.inputs.task_done()
+
+    async def __async_scan(self) -> None:
+        """
+        Feed requests from the input queue to the asynchronous workers, sharing a single HTTP client
+        :return: None
+        """
+        import asyncio
+
+        loop = asyncio.get_running_loop()
+        pending = asyncio.Queue(maxsize=self._nb_workers)
+        async with self.scanapi.async_client(self._nb_workers) as client:
+            workers = [asyncio.create_task(self.__async_worker(client, pending, i + 1))
+                       for i in range(self._nb_workers)]
+            stopped = 0
+            while stopped < self._nb_workers:  # Forward every request (and stop sentinel) to the workers
+                wfp = await loop.run_in_executor(None, self.__async_take)
+                if wfp is None:
+                    stopped += 1
+                await pending.put(wfp)
+            await asyncio.gather(*workers)
+
+    async def __async_worker(self, client, pending, worker_id: int) -> None:
+        """
+        Take each request and process it asynchronously (until a stop sentinel is received)
+        :param client: HTTP client to post with
+        :param pending: queue of requests to process (asyncio.Queue)
+        :param worker_id: ID of this worker
+        :return: None
+        """
+        self.print_trace(f'Starting async worker {worker_id}...')
+        while True:
+            wfp = await pending.get()
+            if wfp is None:                      # Stop sentinel received
+                self.__async_task_done()
+                break
+            try:
+                self.print_trace(f'Processing input request ({worker_id})...')
+                count = self.__count_files_in_wfp(wfp)
+                resp = await self.scanapi.ascan(client, wfp, scan_id=worker_id)
+                if resp:
+                    self.output.put(resp)  # Store the output response to later collection
+                self.update_bar(count)
+                self.print_trace(f'Request complete ({worker_id}).')
+            except Exception as e:
+                ThreadedScanning.print_stderr(f'ERROR: Problem encountered running scan: {e}')
+                self._errors = True
+            self.__async_task_done()  # Not done on cancellation, so worker_async can report the dropped request
+        self.print_trace(f'Async worker complete ({worker_id}).')
+
 #
 # End of ThreadedScanning Class
 #
\ No newline at end of file
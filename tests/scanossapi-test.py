@@ -0,0 +1,35 @@
+import unittest
+
+from scanoss.scanossapi import ScanossApi, RETRY_MIN_DELAY, RETRY_MAX_DELAY
+
+
+class StubResponse:
+    """
+    Stand-in for a failed HTTP response
+    """
+    def __init__(self, headers: dict):
+        self.headers = headers
+
+
+class MyTestCase(unittest.TestCase):
+    retry_delay = staticmethod(ScanossApi._ScanossApi__retry_delay)
+
+    def test_retry_backoff_bounds(self):
+        for retry in range(1, 7):
+            max_delay = min(RETRY_MAX_DELAY, RETRY_MIN_DELAY * (2 ** retry))
+            for _ in range(50):
+                delay = self.retry_delay(retry)
+                self.assertGreaterEqual(delay, RETRY_MIN_DELAY)
+                self.assertLessEqual(delay, max_delay)
+
+    def test_retry_after_header(self):
+        self.assertEqual(self.retry_delay(1, StubResponse({'Retry-After': '7'})), 7.0)
+        self.assertEqual(self.retry_delay(1, StubResponse({'Retry-After': '3600'})), RETRY_MAX_DELAY)
+        self.assertEqual(self.retry_delay(1, StubResponse({'Retry-After': '-5'})), 0.0)
+        delay = self.retry_delay(1, StubResponse({'Retry-After': 'Wed, 21 Oct 2015 07:28:00 GMT'}))
+        self.assertGreaterEqual(delay, RETRY_MIN_DELAY)
+        self.assertLessEqual(delay, RETRY_MIN_DELAY * 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
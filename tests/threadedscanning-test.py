@@ -0,0 +1,98 @@
+import os
+import tempfile
+import unittest
+
+from scanoss.scanner import Scanner
+from scanoss.threadedscanning import ThreadedScanning
+
+
+class StubAsyncClient:
+    """
+    Stand-in for httpx.AsyncClient (the stub API never uses it)
+    """
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        return False
+
+
+class StubScanossApi:
+    """
+    Stand-in for ScanossApi, returning a result for each file in the posted WFP
+    """
+    def __init__(self, fail_async: bool = False):
+        self.fail_async = fail_async
+
+    def scan(self, wfp, context=None, scan_id=None):
+        return {line.split(b',', 2)[2].decode(): [{'id': 'none'}]
+                for line in wfp.splitlines() if line.startswith(b'file=')}
+
+    async def ascan(self, client, wfp, context=None, scan_id=None):
+        return self.scan(wfp, context, scan_id)
+
+    @staticmethod
+    def async_supported() -> bool:
+        return True
+
+    def async_client(self, max_connections: int):
+        if self.fail_async:
+            raise RuntimeError('async client failure')
+        return StubAsyncClient()
+
+    def close(self):
+        pass
+
+
+def wfp_post(index: int) -> bytes:
+    return f'file=0123456789abcdef,10,file-{index}.c\n4=abcdef\n'.encode('utf-8')
+
+
+class MyTestCase(unittest.TestCase):
+    def scan_posts(self, threaded: ThreadedScanning, posts: int):
+        self.assertTrue(threaded.start())
+        for i in range(posts):
+            threaded.queue_add(wfp_post(i))
+        self.assertTrue(threaded.finish())
+        files = set()
+        for resp in threaded.responses:
+            files.update(resp.keys())
+        self.assertEqual(files, {f'file-{i}.c' for i in range(posts)})
+
+    def test_streaming_more_than_queue_size(self):
+        threaded = ThreadedScanning(StubScanossApi(), quiet=True, nb_threads=2)
+        self.scan_posts(threaded, 20)  # More posts than the input queue can hold (2 * nb_threads)
+
+    def test_str_posts(self):
+        threaded = ThreadedScanning(StubScanossApi(), quiet=True, nb_threads=2)
+        self.assertTrue(threaded.start())
+        threaded.queue_add(wfp_post(1).decode('utf-8'))
+        self.assertTrue(threaded.finish())
+        self.assertEqual(threaded.responses, [{'file-1.c': [{'id': 'none'}]}])
+
+    def test_no_posts(self):
+        threaded = ThreadedScanning(StubScanossApi(), quiet=True, nb_threads=3)
+        self.assertTrue(threaded.start())
+        self.assertTrue(threaded.finish())
+        self.assertEqual(threaded.responses, [])
+
+    def test_no_files_in_folder(self):
+        scanner = Scanner(quiet=True, nb_threads=2, no_wfp_file=True)
+        scanner.threaded_scan.scanapi = StubScanossApi()
+        with tempfile.TemporaryDirectory() as scan_dir:
+            self.assertTrue(scanner.scan_folder(scan_dir))
+        self.assertIsNone(scanner.threaded_scan._bar_thread)
+        self.assertEqual(scanner.threaded_scan.responses, [])
+
+    def test_async_scanning(self):
+        threaded = ThreadedScanning(StubScanossApi(), quiet=True, nb_threads=3, use_async=True)
+        self.scan_posts(threaded, 20)
+
+    def test_async_failure_fallback(self):
+        threaded = ThreadedScanning(StubScanossApi(fail_async=True), quiet=True, nb_threads=3, use_async=True)
+        self.scan_posts(threaded, 20)
+        self.assertFalse(threaded._errors)
+
+
+if __name__ == '__main__':
+    unittest.main()